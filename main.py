@@ -1,14 +1,38 @@
+import io
 import os
-import json
+import re
+import time
+import asyncio
+import uuid
+import shutil
+import zipfile
+import hashlib
 import subprocess
-import requests
-from bs4 import BeautifulSoup
+import weakref
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import orjson
+import diskcache
+import tiktoken
 from fastapi import FastAPI, UploadFile, Form, HTTPException
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from groq import Groq
-from jinja2 import Environment, FileSystemLoader
+from groq import AsyncGroq
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from pypdf import PdfReader
+from readability import Document
+from selectolax.lexbor import LexborHTMLParser
+from arq import create_pool
+from arq.connections import RedisSettings
+from arq.jobs import Job, JobStatus
+
+try:
+    # Optional: enables near-duplicate hits in the LLM cache
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
 
 # --- 1. CONFIGURATION ---
 app = FastAPI(title="Resume & Cover Letter Generator")
@@ -24,9 +48,41 @@ app.add_middleware(
 
 # Initialize Groq Client
 # It will read the key you passed in the 'docker run' command
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+
+# Shared pool for scraping job pages, so repeat hosts skip the TCP/TLS handshake
+http_client = httpx.AsyncClient(
+    timeout=10,
+    http2=True,
+    follow_redirects=True,
+    headers={'User-Agent': 'Mozilla/5.0'},
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+)
+
+LATEX_REPLACEMENTS = {
+    '%': '\\%',
+    '$': '\\$',
+    '#': '\\#',
+    '_': '\\_',
+    '&': '\\&',
+    '{': '\\{',
+    '}': '\\}',
+    '~': '\\textasciitilde{}',
+    '^': '\\textasciicircum{}'
+}
+LATEX_TRANSLATION = str.maketrans(LATEX_REPLACEMENTS)
+
+def escape_latex(text: str) -> str:
+    """Escapes special LaTeX characters to prevent PDF crashes."""
+    if not isinstance(text, str):
+        return text
+    return text.translate(LATEX_TRANSLATION)
 
 # Setup Jinja2 for LaTeX
+# Compiled templates are cached on disk so restarts skip re-parsing them
+JINJA_CACHE_DIR = "/tmp/jinja_cache"
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+
 env = Environment(
     loader=FileSystemLoader("templates"),
     block_start_string='\BLOCK{',
@@ -39,7 +95,16 @@ env = Environment(
     line_comment_prefix='%#',
     trim_blocks=True,
     autoescape=False,
+    auto_reload=False,
+    cache_size=64,
+    bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
 )
+# Templates escape every value with \VAR{ value | tex }
+env.filters["tex"] = escape_latex
+
+# Load templates once at import instead of on every request
+RESUME_TEMPLATE = env.get_template("resume_template.tex")
+COVER_LETTER_TEMPLATE = env.get_template("cover_letter_template.tex")
 
 PERSONAL_INFO = {
     "name": "Ishaan Pandey",
@@ -50,53 +115,304 @@ PERSONAL_INFO = {
     "university": "Bachelor of Technology, Computer Science & Engineering"
 }
 
+# Prompts
+# Constant per endpoint, so LLM cache keys only change with the user message.
+# Never interpolate per-request data into them; that goes in the user message.
+RESUME_JSON_SCHEMA = """{
+        "summary": "Professional summary...",
+        "experience": [
+            {
+                "company": "Company Name",
+                "location": "City, Country",
+                "role": "Role Title",
+                "duration": "Dates",
+                "points": ["Action bullet 1", "Action bullet 2"]
+            }
+        ],
+        "projects": [
+            {
+                "title": "Project Name",
+                "technologies": "Tools used",
+                "points": ["Bullet 1", "Bullet 2"]
+            }
+        ],
+        "skills": {
+            "analytics": "Analytics tools",
+            "ml_ai": "AI tools",
+            "languages": "Programming languages",
+            "web": "Web technologies",
+            "tools": "Other tools"
+        },
+        "education": [
+            {"institution": "Uni Name", "year": "2022-2026", "degree": "Degree", "score": "CGPA"}
+        ]
+    }"""
+
+COVER_LETTER_JSON_SCHEMA = """{
+        "company_name": "Company Name",
+        "job_role": "Job Title",
+        "job_location": "Location",
+        "letter_body": "Full body text. Use double newlines \\n\\n for paragraphs."
+    }"""
+
+RESUME_SYSTEM_PROMPT = """
+    You are an expert ATS resume writer. 
+    Analyze the user's old resume and the target job description.
+    Rewrite the resume content to highlight skills relevant to the job.
+    
+    CRITICAL RULES:
+    1. Output ONLY valid JSON.
+    2. Do NOT use Markdown blocks.
+    3. Do NOT use special characters like % or $ or & in the text values (spell them out: percent, USD, and).
+    
+    REQUIRED JSON STRUCTURE:
+    """ + RESUME_JSON_SCHEMA + """
+    """
+
+COVER_LETTER_SYSTEM_PROMPT = """
+    Write a persuasive cover letter based on the Resume and Job.
+    OUTPUT JSON ONLY:
+    """ + COVER_LETTER_JSON_SCHEMA + """
+    """
+
+# Resume and cover letter from one model call, for /generate_bundle
+BUNDLE_SYSTEM_PROMPT = """
+    You are an expert ATS resume writer.
+    Analyze the user's old resume and the target job description.
+    Rewrite the resume content to highlight skills relevant to the job,
+    and write a persuasive cover letter for the same job.
+    
+    CRITICAL RULES:
+    1. Output ONLY valid JSON.
+    2. Do NOT use Markdown blocks.
+    3. Do NOT use special characters like % or $ or & in the text values (spell them out: percent, USD, and).
+    
+    REQUIRED JSON STRUCTURE:
+    {
+        "resume": """ + RESUME_JSON_SCHEMA + """,
+        "cover_letter": """ + COVER_LETTER_JSON_SCHEMA + """
+    }
+    """
+
+# Background job queue (see worker.py); finished PDFs are kept for JOB_RESULT_TTL seconds
+REDIS_SETTINGS = RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379"))
+JOB_RESULT_TTL = 3600
+
+# Cover letters are short and not reasoning-heavy, so a smaller, faster model is enough.
+# Set COVER_LETTER_MODEL to compare against the resume model.
+RESUME_MODEL = "llama-3.3-70b-versatile"
+COVER_LETTER_MODEL = os.getenv("COVER_LETTER_MODEL", "llama-3.1-8b-instant")
+
+# LLM response cache: exact SHA-256 hits, plus embedding near-matches when available.
+# diskcache is safe to share between the worker's threads and processes, and
+# evicts the least recently stored entries once LLM_CACHE_SIZE_LIMIT is reached.
+LLM_CACHE_DIR = os.path.join("data", "llm_cache")
+LLM_CACHE_SIZE_LIMIT = 64 * 1024 * 1024
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_INDEX_LIMIT = 1000  # most recent embeddings kept per scope
+
+# prompt hash -> response, "scope:<scope hash>" -> [(prompt hash, embedding), ...]
+llm_cache = diskcache.Cache(LLM_CACHE_DIR, size_limit=LLM_CACHE_SIZE_LIMIT)
+embedder = None
+
 # --- 2. HELPER FUNCTIONS ---
 
-def scrape_job_link(url: str) -> str:
-    """Scrapes text from a job posting URL."""
+def normalize_prompt(text: str) -> str:
+    """Collapses whitespace and case so trivially different prompts share a key."""
+    return " ".join(text.split()).lower()
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(normalize_prompt(text).encode("utf-8")).hexdigest()
+
+def load_embedder():
+    """Loads the embedding model for near-duplicate cache hits (if installed)."""
+    global embedder
+    if SentenceTransformer is not None and embedder is None:
+        embedder = SentenceTransformer(EMBEDDING_MODEL)
+
+def find_similar_response(scope_hash: str, embedding):
+    """Returns the cached response whose job text is closest to `embedding`,
+    if its cosine similarity clears SEMANTIC_CACHE_THRESHOLD."""
+    index = llm_cache.get(f"scope:{scope_hash}")
+    if not index:
+        return None
+    # Embeddings are L2-normalized, so the dot product is the cosine similarity
+    scores = np.asarray([vector for _, vector in index]) @ np.asarray(embedding)
+    best = int(np.argmax(scores))
+    if scores[best] >= SEMANTIC_CACHE_THRESHOLD:
+        return llm_cache.get(index[best][0])  # None if the response was evicted
+    return None
+
+def store_llm_response(key: str, scope_hash: str, embedding, ai_data: dict):
+    llm_cache.set(key, ai_data)
+    if embedding is None:
+        return
+    with llm_cache.transact():
+        index = llm_cache.get(f"scope:{scope_hash}", [])
+        index.append((key, embedding))
+        llm_cache.set(f"scope:{scope_hash}", index[-SEMANTIC_INDEX_LIMIT:])
+
+def parse_llm_json(content: str) -> dict:
+    """Parses the model's JSON output, tolerating a stray Markdown code fence."""
+    content = content.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+    return orjson.loads(content)
+
+async def cached_chat_completion(model: str, system: str, final_job_text: str, resume_text: str, temperature: float, semantic: bool = False):
+    """Calls Groq for a JSON response, serving exact and (if `semantic`) near-duplicate prompts from cache.
+
+    Returns (ai_data, cache_entry). A fresh response is not cached yet: pass
+    cache_entry to cache_llm_response once its PDFs have rendered.
+    """
+    user = build_user_message(final_job_text, resume_text)
+    key = hash_text(f"{model}\n{system}\n{user}")
+
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached, None
+
+    # Near-duplicates must share the model, prompt and old resume exactly; only the
+    # job text is compared by embedding. (The resume would otherwise fill the
+    # embedder's 256 word-piece window and every job would look the same.)
+    # Only callers whose output does not name the employer opt in: two postings for
+    # the same role at different companies can score above the threshold.
+    scope_hash = hash_text(f"{model}\n{system}\n{resume_text}")
+    embedding = None
+    if semantic and embedder is not None:
+        vector = await asyncio.to_thread(embedder.encode, normalize_prompt(final_job_text), normalize_embeddings=True)
+        embedding = vector.tolist()
+        similar = find_similar_response(scope_hash, embedding)
+        if similar is not None:
+            return similar, None
+
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ],
+        response_format={"type": "json_object"},
+        temperature=temperature
+    )
+    ai_data = parse_llm_json(response.choices[0].message.content)
+    return ai_data, (key, scope_hash, embedding)
+
+async def cache_llm_response(cache_entry, ai_data: dict):
+    """Caches a response whose PDFs rendered, so unusable output is never replayed."""
+    if cache_entry is None:
+        return
+    try:
+        await asyncio.to_thread(store_llm_response, *cache_entry, ai_data)
+    except Exception as e:
+        print(f"Could not store LLM response in cache: {e}")
+
+# Scraped job pages: served from cache for SCRAPE_CACHE_TTL seconds, then revalidated
+SCRAPE_CACHE_TTL = 3600
+SCRAPE_CACHE_EXPIRE = 24 * 3600
+scrape_cache = diskcache.Cache("/tmp/scrape_cache")
+scrape_locks = weakref.WeakValueDictionary()  # url -> asyncio.Lock, dropped once unused
+
+# Page chrome that never belongs to a job description
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "footer", "header", "aside", "form"]
+
+# Job description containers on known boards, most specific first
+JOB_DESCRIPTION_SELECTORS = [
+    "div#jobDescriptionText",  # Indeed
+    "div[data-jobid]",  # LinkedIn
+    "div.job-description",  # Generic
+]
+
+def html_to_text(html: str) -> str:
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(BOILERPLATE_TAGS)
+    return tree.body.text(separator=' ', strip=True) if tree.body else ""
+
+def extract_job_text(html: str) -> str:
+    """Extracts only the job description from a job page, dropping site boilerplate."""
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(BOILERPLATE_TAGS)
+    for selector in JOB_DESCRIPTION_SELECTORS:
+        node = tree.css_first(selector)
+        if node is not None:
+            text = node.text(separator=' ', strip=True)
+            if text:
+                return text
+
+    # Unknown board: let readability find the main content block
+    try:
+        text = html_to_text(Document(html).summary(html_partial=True))
+        if text:
+            return text
+    except Exception as e:
+        print(f"Readability extraction failed: {e}")
+
+    return tree.body.text(separator=' ', strip=True) if tree.body else ""
+
+async def fetch_job_text(url: str) -> str:
+    """Fetches and extracts a job page, revalidating cached copies with conditional GETs."""
+    headers = {}
+    cached = await asyncio.to_thread(scrape_cache.get, url)
+    if cached:
+        if time.time() - cached["fetched_at"] < SCRAPE_CACHE_TTL:
+            return cached["text"]
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = await http_client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        if not cached:
+            raise
+        # A stale copy beats failing the job when the site is unreachable
+        print(f"Revalidation failed, serving cached copy: {e}")
+        return cached["text"]
+
+    if response.status_code == 304 and cached:
+        text = cached["text"]
+    else:
+        text = await asyncio.to_thread(extract_job_text, response.text)
+        text = trim_to_tokens(text, JOB_TOKEN_BUDGET)
+
+    if text and (response.is_success or response.status_code == 304):
+        await asyncio.to_thread(scrape_cache.set, url, {
+            "text": text,
+            "etag": response.headers.get("ETag") or (cached or {}).get("etag"),
+            "last_modified": response.headers.get("Last-Modified") or (cached or {}).get("last_modified"),
+            "fetched_at": time.time(),
+        }, expire=SCRAPE_CACHE_EXPIRE)
+    return text
+
+async def scrape_job_link(url: str) -> str:
+    """Scrapes the job description from a job posting URL."""
+    # Concurrent requests for the same URL wait for a single fetch, then hit the cache
+    lock = scrape_locks.get(url)
+    if lock is None:
+        lock = scrape_locks[url] = asyncio.Lock()
     try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text = soup.get_text(separator=' ', strip=True)
-        return text[:10000]  # Limit to 10k chars
+        async with lock:
+            return await fetch_job_text(url)
     except Exception as e:
         print(f"Scraping failed: {e}")
         return ""
 
-def escape_latex(text: str) -> str:
-    """Escapes special LaTeX characters to prevent PDF crashes."""
-    if not isinstance(text, str):
-        return text
-    replacements = {
-        '%': '\\%',
-        '$': '\\$',
-        '#': '\\#',
-        '_': '\\_',
-        '&': '\\&',
-        '{': '\\{',
-        '}': '\\}',
-        '~': '\\textasciitilde{}',
-        '^': '\\textasciicircum{}'
-    }
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    return text
+CROSS_REF_RE = re.compile(r"\\(?:ref|pageref|eqref|cite|tableofcontents)\b")
 
-def clean_json_data(data):
-    """Recursively escapes LaTeX characters in the JSON data."""
-    if isinstance(data, dict):
-        return {k: clean_json_data(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [clean_json_data(item) for item in data]
-    elif isinstance(data, str):
-        return escape_latex(data)
-    else:
-        return data
+# pdflatex is write-heavy, so compile on tmpfs when the host provides it.
+# Compile directories are removed as soon as the PDF has been moved to OUTPUT_ROOT.
+LATEX_WORK_ROOT = os.getenv("LATEX_WORK_ROOT") or ("/dev/shm" if os.path.isdir("/dev/shm") else "/tmp")
+
+# Finished PDFs and zips, kept for JOB_RESULT_TTL seconds. This must be on disk and,
+# when the web and worker run as separate containers, a volume mounted in both.
+OUTPUT_ROOT = os.getenv("OUTPUT_ROOT", "/tmp/outputs")
+
+# Preamble formats (<filename_base>.fmt) dumped with mylatexformat by the Dockerfile
+LATEX_FORMAT_DIR = os.path.abspath("formats")
 
 def compile_latex(job_id: str, tex_content: str, filename_base: str):
     """Compiles LaTeX to PDF."""
-    work_dir = f"/tmp/{job_id}"
+    work_dir = os.path.join(LATEX_WORK_ROOT, job_id)
     os.makedirs(work_dir, exist_ok=True)
     
     tex_filename = f"{filename_base}.tex"
@@ -105,130 +421,214 @@ def compile_latex(job_id: str, tex_content: str, filename_base: str):
     with open(tex_path, "w", encoding="utf-8") as f:
         f.write(tex_content)
     
+    options = ["-interaction=batchmode", "-halt-on-error", "-output-directory", work_dir]
+    latex_env = None
+    if os.path.exists(os.path.join(LATEX_FORMAT_DIR, f"{filename_base}.fmt")):
+        # Load the precompiled preamble instead of re-parsing every package
+        options.append(f"-fmt={filename_base}")
+        latex_env = {**os.environ, "TEXFORMATS": f"{LATEX_FORMAT_DIR}:"}
+
+    cmd_final = ["pdflatex", *options, tex_path]
+    cmd_draft = ["pdflatex", "-draftmode", *options, tex_path]
+
+    output_path = os.path.join(OUTPUT_ROOT, f"{job_id}.pdf")
     try:
-        # Run pdflatex twice for formatting
-        cmd = ["pdflatex", "-interaction=nonstopmode", "-output-directory", work_dir, tex_path]
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        # Cross-references need a first pass to write the .aux file; -draftmode
+        # skips PDF output for it. Documents without references compile in one pass.
+        if CROSS_REF_RE.search(tex_content):
+            subprocess.run(cmd_draft, check=True, stdout=subprocess.DEVNULL, env=latex_env)
+        subprocess.run(cmd_final, check=True, stdout=subprocess.DEVNULL, env=latex_env)
+        os.makedirs(OUTPUT_ROOT, exist_ok=True)
+        shutil.move(os.path.join(work_dir, f"{filename_base}.pdf"), output_path)
     except subprocess.CalledProcessError as e:
         print(f"LaTeX Compilation Failed: {e}")
         raise HTTPException(status_code=500, detail="LaTeX compilation failed on the server.")
+    finally:
+        # Keep only the PDF; the .tex/.aux/.log files would otherwise sit in tmpfs
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return output_path
+
+# Bounds concurrent pdflatex processes to the number of CPUs
+LATEX_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+async def run_in_latex_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(LATEX_POOL, func, *args)
+
+# Token budgets for the per-request parts of the prompt
+RESUME_TOKEN_BUDGET = 1200
+JOB_TOKEN_BUDGET = 1500
+
+@functools.lru_cache(maxsize=None)
+def get_token_encoding() -> tiktoken.Encoding:
+    """Loads the tokenizer once (the Dockerfile pre-downloads it)."""
+    return tiktoken.get_encoding("cl100k_base")
 
-    return os.path.join(work_dir, f"{filename_base}.pdf")
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncates text to at most max_tokens tokens."""
+    encoding = get_token_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+# Prompts only use the first RESUME_TOKEN_BUDGET tokens, so stop extracting past this
+PDF_TEXT_LIMIT = 6000
 
-def extract_text_from_pdf(file: UploadFile) -> str:
-    text = ""
+def extract_text_from_pdf(data: bytes) -> str:
+    parts = []
+    total = 0
     try:
-        reader = PdfReader(file.file)
+        reader = PdfReader(io.BytesIO(data))
         for page in reader.pages:
-            text += page.extract_text() or ""
+            page_text = page.extract_text() or ""
+            parts.append(page_text)
+            total += len(page_text)
+            if total >= PDF_TEXT_LIMIT:
+                break
     except Exception as e:
         print(f"Error reading PDF: {e}")
-    return text
+    return "".join(parts)
 
-# --- 3. ENDPOINTS ---
+async def read_inputs(job_desc: str, job_link: str, resume_bytes: bytes):
+    """Resolves the job text and old resume text, scraping and PDF parsing concurrently."""
+    async def job_text() -> str:
+        if job_desc and len(job_desc.strip()) > 0:
+            return job_desc
+        if job_link:
+            return await scrape_job_link(job_link)
+        return ""
 
-@app.post("/generate")
-async def generate_resume(
-    job_desc: str = Form(None),
-    job_link: str = Form(None),
-    old_resume: UploadFile = None
-):
-    # 1. Handle Inputs
-    final_job_text = ""
-    if job_desc and len(job_desc.strip()) > 0:
-        final_job_text = job_desc
-    elif job_link:
-        final_job_text = scrape_job_link(job_link)
-    
-    if not final_job_text:
-        raise HTTPException(status_code=400, detail="Please provide Job Description or Job Link")
-    
-    resume_text = ""
-    if old_resume:
-        resume_text = extract_text_from_pdf(old_resume)
+    async def resume_text() -> str:
+        if resume_bytes:
+            return await asyncio.to_thread(extract_text_from_pdf, resume_bytes)
+        return ""
 
-    # 2. Define Prompt
-    system_prompt = """
-    You are an expert ATS resume writer. 
-    Analyze the user's old resume and the target job description.
-    Rewrite the resume content to highlight skills relevant to the job.
-    
-    CRITICAL RULES:
-    1. Output ONLY valid JSON.
-    2. Do NOT use Markdown blocks.
-    3. Do NOT use special characters like % or $ or & in the text values (spell them out: percent, USD, and).
-    
-    REQUIRED JSON STRUCTURE:
-    {
-        "summary": "Professional summary...",
-        "experience": [
-            {
-                "company": "Company Name",
-                "location": "City, Country",
-                "role": "Role Title",
-                "duration": "Dates",
-                "points": ["Action bullet 1", "Action bullet 2"]
-            }
-        ],
-        "projects": [
-            {
-                "title": "Project Name",
-                "technologies": "Tools used",
-                "points": ["Bullet 1", "Bullet 2"]
-            }
-        ],
-        "skills": {
-            "analytics": "Analytics tools",
-            "ml_ai": "AI tools",
-            "languages": "Programming languages",
-            "web": "Web technologies",
-            "tools": "Other tools"
-        },
-        "education": [
-            {"institution": "Uni Name", "year": "2022-2026", "degree": "Degree", "score": "CGPA"}
-        ]
-    }
-    """
+    return await asyncio.gather(job_text(), resume_text())
+
+def build_user_message(final_job_text: str, resume_text: str) -> str:
+    """Per-request prompt input; goes after the static system prompt."""
+    return (
+        f"OLD RESUME:\n{trim_to_tokens(resume_text, RESUME_TOKEN_BUDGET)}\n\n"
+        f"TARGET JOB:\n{trim_to_tokens(final_job_text, JOB_TOKEN_BUDGET)}"
+    )
 
-    user_message = f"OLD RESUME:\n{resume_text[:4000]}\n\nTARGET JOB:\n{final_job_text[:4000]}"
+def render_resume_pdf(ai_data: dict) -> dict:
+    """Renders and compiles the model's resume JSON. Returns the file path and download name."""
+    # 1. Render
+    full_data = {"personal_info": PERSONAL_INFO, **ai_data}
 
-    # 3. Call AI
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.4
+        rendered_tex = RESUME_TEMPLATE.render(**full_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Template Error: {str(e)}")
+
+    # 2. Compile
+    company_name = "Resume"
+    if ai_data.get("experience"):
+        company_name = ai_data["experience"][0]["company"].split()[0]
+
+    safe_name = "".join(x for x in company_name if x.isalnum())
+    job_id = f"res_{safe_name}_{uuid.uuid4().hex[:8]}"
+
+    pdf_path = compile_latex(job_id, rendered_tex, "resume")
+    return {"path": pdf_path, "filename": f"Ishaan_Resume_{safe_name}.pdf", "media_type": "application/pdf"}
+
+def render_cover_letter_pdf(ai_data: dict) -> dict:
+    """Renders and compiles the model's cover letter JSON. Returns the file path and download name."""
+    # 1. Render
+    full_data = {"personal_info": PERSONAL_INFO, **ai_data}
+
+    rendered_tex = COVER_LETTER_TEMPLATE.render(**full_data)
+
+    # 2. Compile
+    safe_company = "".join(x for x in ai_data['company_name'] if x.isalnum())
+    job_id = f"cl_{safe_company}_{uuid.uuid4().hex[:8]}"
+
+    pdf_path = compile_latex(job_id, rendered_tex, "cover_letter")
+    return {"path": pdf_path, "filename": f"Ishaan_CL_{safe_company}.pdf", "media_type": "application/pdf"}
+
+def zip_outputs(outputs: list, filename: str) -> dict:
+    """Packs rendered PDFs into one zip and removes the individual PDFs."""
+    zip_path = os.path.join(OUTPUT_ROOT, f"bundle_{uuid.uuid4().hex[:8]}.zip")
+
+    # PDFs are already compressed
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for output in outputs:
+            archive.write(output["path"], arcname=output["filename"])
+            os.remove(output["path"])
+
+    return {"path": zip_path, "filename": filename, "media_type": "application/zip"}
+
+async def build_resume(final_job_text: str, resume_text: str) -> dict:
+    """Generates a tailored resume PDF."""
+    try:
+        ai_data, cache_entry = await cached_chat_completion(
+            RESUME_MODEL, RESUME_SYSTEM_PROMPT, final_job_text, resume_text, temperature=0.4, semantic=True
         )
-        ai_data = json.loads(response.choices[0].message.content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
-    # 4. Clean Data & Render
-    clean_data = clean_json_data(ai_data)
-    full_data = {"personal_info": PERSONAL_INFO, **clean_data}
+    output = await run_in_latex_pool(render_resume_pdf, ai_data)
+    await cache_llm_response(cache_entry, ai_data)
+    return output
 
+async def build_cover_letter(final_job_text: str, resume_text: str) -> dict:
+    """Generates a cover letter PDF."""
     try:
-        template = env.get_template("resume_template.tex")
-        rendered_tex = template.render(**full_data)
+        ai_data, cache_entry = await cached_chat_completion(
+            COVER_LETTER_MODEL, COVER_LETTER_SYSTEM_PROMPT, final_job_text, resume_text, temperature=0.7
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Template Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
-    # 5. Compile & Return
-    company_name = "Resume"
-    if clean_data.get("experience"):
-        company_name = clean_data["experience"][0]["company"].split()[0]
-    
-    safe_name = "".join(x for x in company_name if x.isalnum())
-    job_id = f"res_{safe_name}"
-    
-    pdf_path = compile_latex(job_id, rendered_tex, "resume")
+    output = await run_in_latex_pool(render_cover_letter_pdf, ai_data)
+    await cache_llm_response(cache_entry, ai_data)
+    return output
+
+async def build_bundle(final_job_text: str, resume_text: str) -> dict:
+    """Generates a resume and cover letter from a single model call and zips both PDFs."""
+    try:
+        ai_data, cache_entry = await cached_chat_completion(
+            RESUME_MODEL, BUNDLE_SYSTEM_PROMPT, final_job_text, resume_text, temperature=0.4
+        )
+        resume_data, cover_letter_data = ai_data["resume"], ai_data["cover_letter"]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
+
+    outputs = await asyncio.gather(
+        run_in_latex_pool(render_resume_pdf, resume_data),
+        run_in_latex_pool(render_cover_letter_pdf, cover_letter_data),
+    )
+    await cache_llm_response(cache_entry, ai_data)
+    safe_company = "".join(x for x in cover_letter_data.get("company_name", "") if x.isalnum())
+    return await asyncio.to_thread(zip_outputs, outputs, f"Ishaan_Application_{safe_company}.zip")
+
+# --- 3. ENDPOINTS ---
+# Generation runs in the arq worker (worker.py). The endpoints enqueue a job and
+# return its id; clients poll /status/{job_id} and fetch the file from /pdf/{job_id}.
+
+@app.on_event("startup")
+async def startup():
+    app.state.redis = await create_pool(REDIS_SETTINGS)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.redis.close()
+
+@app.post("/generate")
+async def generate_resume(
+    job_desc: str = Form(None),
+    job_link: str = Form(None),
+    old_resume: UploadFile = None
+):
+    if not (job_desc and len(job_desc.strip()) > 0) and not job_link:
+        raise HTTPException(status_code=400, detail="Please provide Job Description or Job Link")
 
-    return FileResponse(pdf_path, media_type="application/pdf", filename=f"Ishaan_Resume_{safe_name}.pdf")
+    resume_bytes = await old_resume.read() if old_resume else None
+    job = await app.state.redis.enqueue_job("generate_resume_task", job_desc, job_link, resume_bytes)
+    return {"job_id": job.job_id}
 
 
 @app.post("/generate_cover_letter")
@@ -237,60 +637,51 @@ async def generate_cover_letter_pdf(
     job_link: str = Form(None),
     old_resume: UploadFile = None
 ):
-    # 1. Handle Inputs
-    final_job_text = ""
-    if job_desc and len(job_desc.strip()) > 0:
-        final_job_text = job_desc
-    elif job_link:
-        final_job_text = scrape_job_link(job_link)
-
-    resume_text = ""
-    if old_resume:
-        resume_text = extract_text_from_pdf(old_resume)
-
-    # 2. Prompt
-    system_prompt = """
-    Write a persuasive cover letter based on the Resume and Job.
-    OUTPUT JSON ONLY:
-    {
-        "company_name": "Company Name",
-        "job_role": "Job Title",
-        "job_location": "Location",
-        "letter_body": "Full body text. Use double newlines \\n\\n for paragraphs."
-    }
-    """
-    
-    user_message = f"RESUME: {resume_text[:3000]}... \n JOB: {final_job_text[:3000]}"
+    resume_bytes = await old_resume.read() if old_resume else None
+    job = await app.state.redis.enqueue_job("generate_cover_letter_task", job_desc, job_link, resume_bytes)
+    return {"job_id": job.job_id}
 
-    # 3. Call AI
-    try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-        ai_data = json.loads(response.choices[0].message.content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
-    # 4. Render
-    clean_data = clean_json_data(ai_data)
-    full_data = {"personal_info": PERSONAL_INFO, **clean_data}
+@app.post("/generate_bundle")
+async def generate_bundle(
+    job_desc: str = Form(None),
+    job_link: str = Form(None),
+    old_resume: UploadFile = None
+):
+    """Resume and cover letter for the same job from one model call, delivered as a zip."""
+    if not (job_desc and len(job_desc.strip()) > 0) and not job_link:
+        raise HTTPException(status_code=400, detail="Please provide Job Description or Job Link")
 
-    template = env.get_template("cover_letter_template.tex")
-    rendered_tex = template.render(**full_data)
+    resume_bytes = await old_resume.read() if old_resume else None
+    job = await app.state.redis.enqueue_job("generate_bundle_task", job_desc, job_link, resume_bytes)
+    return {"job_id": job.job_id}
 
-    # 5. Compile
-    safe_company = "".join(x for x in clean_data['company_name'] if x.isalnum())
-    job_id = f"cl_{safe_company}"
-    
-    pdf_path = compile_latex(job_id, rendered_tex, "cover_letter")
 
-    return FileResponse(pdf_path, media_type="application/pdf", filename=f"Ishaan_CL_{safe_company}.pdf")
+@app.get("/status/{job_id}")
+async def job_status(job_id: str):
+    job = Job(job_id, app.state.redis)
+    status = await job.status()
+    if status == JobStatus.not_found:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if status != JobStatus.complete:
+        return {"state": status.value, "pdf_url": None}
+
+    result = await job.result_info()
+    if not result.success:
+        return {"state": "failed", "pdf_url": None, "detail": str(result.result)}
+    return {"state": "complete", "pdf_url": f"/pdf/{job_id}"}
+
+
+@app.get("/pdf/{job_id}")
+async def download_pdf(job_id: str):
+    result = await Job(job_id, app.state.redis).result_info()
+    if result is None or not result.success:
+        raise HTTPException(status_code=404, detail="File not available")
+    output = result.result
+    if not os.path.exists(output["path"]):
+        raise HTTPException(status_code=410, detail="File has expired")
+
+    return FileResponse(output["path"], media_type=output["media_type"], filename=output["filename"])
 
 if __name__ == "__main__":
     import uvicorn
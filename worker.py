@@ -0,0 +1,75 @@
+import os
+import time
+from arq import cron
+from fastapi import HTTPException
+
+from main import (
+    REDIS_SETTINGS,
+    JOB_RESULT_TTL,
+    OUTPUT_ROOT,
+    client,
+    http_client,
+    load_embedder,
+    read_inputs,
+    build_resume,
+    build_cover_letter,
+    build_bundle,
+)
+
+# Run with: arq worker.WorkerSettings
+# Uses the same image, REDIS_URL and OUTPUT_ROOT as the web server.
+
+# --- TASKS ---
+# Failures are re-raised as RuntimeError: arq pickles job results, and
+# HTTPException cannot be unpickled by the web process.
+
+async def generate_resume_task(ctx, job_desc: str, job_link: str, resume_bytes: bytes) -> dict:
+    try:
+        final_job_text, resume_text = await read_inputs(job_desc, job_link, resume_bytes)
+        if not final_job_text:
+            raise HTTPException(status_code=400, detail="Could not read the job description")
+        return await build_resume(final_job_text, resume_text)
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from None
+
+async def generate_cover_letter_task(ctx, job_desc: str, job_link: str, resume_bytes: bytes) -> dict:
+    try:
+        final_job_text, resume_text = await read_inputs(job_desc, job_link, resume_bytes)
+        return await build_cover_letter(final_job_text, resume_text)
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from None
+
+async def generate_bundle_task(ctx, job_desc: str, job_link: str, resume_bytes: bytes) -> dict:
+    try:
+        final_job_text, resume_text = await read_inputs(job_desc, job_link, resume_bytes)
+        if not final_job_text:
+            raise HTTPException(status_code=400, detail="Could not read the job description")
+        return await build_bundle(final_job_text, resume_text)
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from None
+
+async def purge_expired_outputs(ctx):
+    """Deletes output files whose job results have expired."""
+    if not os.path.isdir(OUTPUT_ROOT):
+        return
+    cutoff = time.time() - JOB_RESULT_TTL
+    for entry in os.scandir(OUTPUT_ROOT):
+        if entry.is_file() and entry.name.startswith(("res_", "cl_", "bundle_")) and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+# --- WORKER ---
+
+async def startup(ctx):
+    load_embedder()
+
+async def shutdown(ctx):
+    await http_client.aclose()
+    await client.close()
+
+class WorkerSettings:
+    functions = [generate_resume_task, generate_cover_letter_task, generate_bundle_task]
+    cron_jobs = [cron(purge_expired_outputs, minute={0, 15, 30, 45})]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = REDIS_SETTINGS
+    keep_result = JOB_RESULT_TTL